@@ -1,11 +1,29 @@
 from __future__ import annotations
 
+import functools
+import hashlib
 import html
 import json
 import re
+import sys
 import zipfile
+from operator import itemgetter
 from pathlib import Path
-import xml.etree.ElementTree as ET
+from typing import IO, Any, Iterator, TextIO
+
+try:
+    from lxml import etree as ET
+
+    _LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+    _LXML = False
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 NS = {
@@ -14,26 +32,64 @@ NS = {
     "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
 }
 
+_SCHEME_RE = re.compile(r"^https?://", re.I)
+_BARE_DOMAIN_RE = re.compile(r"^[\w.-]+\.[a-z]{2,}", re.I)
+
+_NO_IMG_HTML = '<div class="w-full h-full flex items-center justify-center text-white/35 text-xs tracking-[0.25em] uppercase">No Image</div>'
+
+# Product card markup, filled per product with positional %-formatting
+_CARD_TEMPLATE = """<a href="%s" %s %s class="lux-card group rounded-3xl overflow-hidden transition duration-500 hover:-translate-y-1">
+  <div class="relative aspect-[4/3] img-shell">
+    <div class="absolute inset-0">%s</div>
+    <div class="absolute inset-0 bg-gradient-to-t from-black/55 via-black/10 to-transparent"></div>
+  </div>
+  <div class="p-7">
+    <div class="text-[11px] tracking-[0.45em] uppercase text-white/45">Collection</div>
+    <div class="mt-3 text-xl tracking-wide text-white/95">%s</div>
+    <div class="mt-3 text-sm text-white/55 leading-relaxed line-clamp-2">%s</div>
+    <div class="mt-6 flex items-center justify-end">
+      <div class="text-[11px] tracking-[0.35em] uppercase text-white/55 group-hover:text-white/85 transition">View</div>
+    </div>
+  </div>
+</a>"""
+
+
+def _iter_closed(f: IO[bytes], tag: str) -> Iterator[Any]:
+    # Yield every `tag` element of the stream f once it is fully parsed,
+    # letting lxml do the tag filtering in C when it is the parser in use
+    if _LXML:
+        for _event, elem in ET.iterparse(f, events=("end",), tag=tag):
+            yield elem
+    else:
+        for _event, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag == tag:
+                yield elem
 
-def col_to_index(col: str) -> int:
-    n = 0
-    for c in col:
-        n = n * 26 + (ord(c) - 64)
-    return n - 1
+
+def _release(elem: Any) -> None:
+    # Free a fully parsed iterparse element
+    elem.clear()
+    # lxml keeps cleared siblings attached to the parent
+    if _LXML:
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
 
 
 def read_shared_strings(z: zipfile.ZipFile) -> list[str]:
     try:
-        sst_xml = z.read("xl/sharedStrings.xml")
+        f = z.open("xl/sharedStrings.xml", "r")
     except KeyError:
         return []
 
-    root = ET.fromstring(sst_xml)
+    si_tag = f"{{{NS['main']}}}si"
+    t_tag = f"{{{NS['main']}}}t"
+
     out: list[str] = []
-    for si in root.findall("main:si", NS):
-        # A shared string can have multiple <t> nodes
-        parts = [t.text or "" for t in si.findall(".//main:t", NS)]
-        out.append("".join(parts))
+    with f:
+        for si in _iter_closed(f, si_tag):
+            # A shared string can have multiple <t> nodes (rich text runs)
+            out.append("".join([t.text or "" for t in si.iter(t_tag)]))
+            _release(si)
     return out
 
 
@@ -66,40 +122,61 @@ def get_first_sheet_path(z: zipfile.ZipFile) -> tuple[str, str]:
 
 
 def read_sheet_rows(z: zipfile.ZipFile, sheet_path: str, shared: list[str]) -> list[list[str]]:
-    ws = ET.fromstring(z.read(sheet_path))
-
-    rows: list[dict[int, str]] = []
-    for row in ws.findall("main:sheetData/main:row", NS):
-        r: dict[int, str] = {}
-        for c in row.findall("main:c", NS):
-            ref = c.attrib.get("r", "")
-            m = re.match(r"([A-Z]+)(\d+)$", ref)
-            if not m:
-                continue
-            col = m.group(1)
-            idx = col_to_index(col)
-            v = c.find("main:v", NS)
-            raw = "" if v is None else (v.text or "")
-            t = c.attrib.get("t")
-            if t == "s":
-                try:
-                    raw = shared[int(raw)]
-                except Exception:
-                    pass
-            r[idx] = raw
-        if r:
-            rows.append(r)
-
-    if not rows:
-        return []
+    row_tag = f"{{{NS['main']}}}row"
+    cell_tag = f"{{{NS['main']}}}c"
+    v_tag = f"{{{NS['main']}}}v"
+
+    rows: list[list[str]] = []
+    width = 0
+    # Stream the worksheet so the full DOM is never built; each <row> is
+    # handled once it closes, then released
+    with z.open(sheet_path, "r") as f:
+        for row in _iter_closed(f, row_tag):
+            r: list[str] = []
+            for c in row:
+                if c.tag != cell_tag:
+                    continue
+                ref = c.get("r", "")
+                # Decode "AB12" in one pass: column letters, then a digit suffix
+                idx = 0
+                i = 0
+                n = len(ref)
+                while i < n and "A" <= ref[i] <= "Z":
+                    idx = idx * 26 + (ord(ref[i]) - 64)
+                    i += 1
+                if i == 0 or not ref[i:].isdecimal():
+                    continue
+                idx -= 1
+                # Scan the children directly; lxml's find() goes through its
+                # ElementPath layer and is several times slower per call
+                raw = ""
+                for v in c:
+                    if v.tag == v_tag:
+                        raw = v.text or ""
+                        break
+                t = c.get("t")
+                if t == "s":
+                    try:
+                        raw = shared[int(raw)]
+                    except Exception:
+                        pass
+                if idx >= len(r):
+                    # Cells are stored in column order; pad any skipped ones
+                    r.extend([""] * (idx - len(r) + 1))
+                r[idx] = raw
+            if r:
+                if len(r) > width:
+                    width = len(r)
+                rows.append(r)
+            _release(row)
 
-    max_col = max(max(r.keys()) for r in rows)
-    out: list[list[str]] = []
     for r in rows:
-        out.append([r.get(i, "") for i in range(max_col + 1)])
-    return out
+        if len(r) < width:
+            r.extend([""] * (width - len(r)))
+    return rows
 
 
+@functools.lru_cache(maxsize=1024)
 def normalize_header(s: str) -> str:
     return str(s or "").strip().lower()
 
@@ -125,78 +202,72 @@ def build_products(xlsx_path: Path) -> list[dict[str, str]]:
     if missing:
         raise ValueError(f"products.xlsx missing headers: {', '.join(missing)} (need name/image/desc/url)")
 
-    products: list[dict[str, str]] = []
-    for row in table[1:]:
-        name = str(row[idx["name"]]).strip()
-        image = str(row[idx["image"]]).strip()
-        desc = str(row[idx["desc"]]).strip()
-        url = str(row[idx["url"]]).strip()
-
-        if not (name or image or url or desc):
-            continue
+    # Clean whole columns at once; map/itemgetter keep the per-cell work in C
+    body = table[1:]
+    names, images, descs, urls = (
+        map(str.strip, map(itemgetter(idx[key]), body))
+        for key in ("name", "image", "desc", "url")
+    )
 
-        products.append({
+    # Skip fully blank rows; the comprehension keeps the fields as fast locals
+    products: list[dict[str, str]] = [
+        {
             "name": name,
             "image": image,
             "desc": desc,
             "url": url,
-        })
+        }
+        for name, image, desc, url in zip(names, images, descs, urls)
+        if name or image or url or desc
+    ]
 
     return products
 
 
-def render_products_html(products: list[dict[str, str]]) -> str:
-    def safe_url(u: str) -> str:
-        u = (u or "").strip()
-        if not u:
-            return ""
-        if re.match(r"^https?://", u, flags=re.I):
-            return u
-        if u.startswith("./") or u.startswith("/"):
-            return u
-        if re.match(r"^[\w.-]+\.[a-z]{2,}", u, flags=re.I):
-            return "https://" + u
+@functools.lru_cache(maxsize=1024)
+def safe_url(u: str) -> str:
+    u = (u or "").strip()
+    if not u:
+        return ""
+    # Plain startswith covers the common lowercase scheme without the regex
+    if u.startswith(("http://", "https://")) or _SCHEME_RE.match(u):
+        return u
+    if u.startswith(("./", "/")):
         return u
+    if _BARE_DOMAIN_RE.match(u):
+        return "https://" + u
+    return u
 
-    cards = []
-    for p in products[:9]:
-        name = html.escape(p.get("name", "") or "")
-        desc = html.escape(p.get("desc", "") or "")
-        img = html.escape(safe_url(p.get("image", "") or ""))
-        url = html.escape(safe_url(p.get("url", "") or ""))
-
-        img_html = (
-            f'<img src="{img}" alt="{name}" class="w-full h-full object-cover opacity-95 group-hover:opacity-100 transition duration-700" loading="lazy" />'
-            if img
-            else '<div class="w-full h-full flex items-center justify-center text-white/35 text-xs tracking-[0.25em] uppercase">No Image</div>'
-        )
-
-        href = url if url else "#"
-        cursor = "" if url else "style=\"cursor:default\""
-        rel = 'rel="noopener noreferrer" target="_blank"' if url else ""
-
-        cards.append(
-            f"""<a href=\"{href}\" {rel} {cursor} class=\"lux-card group rounded-3xl overflow-hidden transition duration-500 hover:-translate-y-1\">\n"
-            f"  <div class=\"relative aspect-[4/3] img-shell\">\n"
-            f"    <div class=\"absolute inset-0\">{img_html}</div>\n"
-            f"    <div class=\"absolute inset-0 bg-gradient-to-t from-black/55 via-black/10 to-transparent\"></div>\n"
-            f"  </div>\n"
-            f"  <div class=\"p-7\">\n"
-            f"    <div class=\"text-[11px] tracking-[0.45em] uppercase text-white/45\">Collection</div>\n"
-            f"    <div class=\"mt-3 text-xl tracking-wide text-white/95\">{name or 'Untitled'}</div>\n"
-            f"    <div class=\"mt-3 text-sm text-white/55 leading-relaxed line-clamp-2\">{desc if desc else '&nbsp;'}</div>\n"
-            f"    <div class=\"mt-6 flex items-center justify-end\">\n"
-            f"      <div class=\"text-[11px] tracking-[0.35em] uppercase text-white/55 group-hover:text-white/85 transition\">View</div>\n"
-            f"    </div>\n"
-            f"  </div>\n"
-            f"</a>"""
-        )
 
-    cards_html = "\n".join(cards) if cards else ""
+def _prepare_card(p: dict[str, str]) -> tuple[str, str, str, str, str, str]:
+    name = html.escape(p.get("name", "") or "")
+    desc = html.escape(p.get("desc", "") or "")
+    # Empty fields skip safe_url/escape and go straight to the fallback markup
+    raw_img = p.get("image", "") or ""
+    raw_url = p.get("url", "") or ""
+    img = html.escape(safe_url(raw_img)) if raw_img else ""
+    url = html.escape(safe_url(raw_url)) if raw_url else ""
+
+    img_html = (
+        f'<img src="{img}" alt="{name}" class="w-full h-full object-cover opacity-95 group-hover:opacity-100 transition duration-700" loading="lazy" />'
+        if img
+        else _NO_IMG_HTML
+    )
+
+    href = url if url else "#"
+    cursor = "" if url else "style=\"cursor:default\""
+    rel = 'rel="noopener noreferrer" target="_blank"' if url else ""
+
+    # Same order as the %s slots in _CARD_TEMPLATE
+    return href, rel, cursor, img_html, name or "Untitled", desc if desc else "&nbsp;"
+
+
+def write_products_html(products: list[dict[str, str]], fp: TextIO) -> None:
+    cards = [_CARD_TEMPLATE % _prepare_card(p) for p in products[:9]]
 
-    products_json = json.dumps(products, ensure_ascii=False)
+    cards_html = "\n".join(cards) if cards else ""
 
-    return f"""<!DOCTYPE html>
+    fp.write(f"""<!DOCTYPE html>
 <html lang=\"zh-CN\">
 <head>
   <meta charset=\"UTF-8\" />
@@ -263,24 +334,57 @@ def render_products_html(products: list[dict[str, str]]) -> str:
   </footer>
 
   <script>
-    window.__PRODUCTS__ = {products_json};
+    window.__PRODUCTS__ = """)
+    if orjson is not None:
+        fp.write(orjson.dumps(products).decode("utf-8"))
+    else:
+        # Serialize straight into the file rather than embedding a JSON string;
+        # compact separators match orjson so the output is the same either way
+        json.dump(products, fp, ensure_ascii=False, separators=(",", ":"))
+    fp.write(""";
   </script>
 </body>
 </html>
-"""
+""")
+
+
+def _file_hash(path: Path) -> "hashlib.blake2b":
+    if hasattr(hashlib, "file_digest"):  # Python 3.11+
+        with path.open("rb") as f:
+            return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16))
+    return hashlib.blake2b(path.read_bytes(), digest_size=16)
+
+
+def source_digest(xlsx_path: Path) -> str:
+    # Cover the generator itself too, so template changes invalidate the cache
+    h = _file_hash(xlsx_path)
+    h.update(Path(__file__).read_bytes())
+    return h.hexdigest()
 
 
 def main() -> None:
     root = Path(__file__).resolve().parent
     xlsx_path = root / "products.xlsx"
     out_path = root / "products.html"
+    cache_path = root / ".products.cache"
+    force = "--force" in sys.argv[1:]
 
     if not xlsx_path.exists():
         raise SystemExit("products.xlsx not found")
 
+    # The cache stores the input digest and the digest of the HTML it produced;
+    # products.html is tracked and edited by sync_products.py, so check both
+    digest = source_digest(xlsx_path)
+    if not force and out_path.exists() and cache_path.exists():
+        cached = cache_path.read_text(encoding="utf-8").split()
+        if cached == [digest, _file_hash(out_path).hexdigest()]:
+            print(f"Up to date: {out_path} (use --force to rebuild)")
+            return
+
     products = build_products(xlsx_path)
-    html_text = render_products_html(products)
-    out_path.write_text(html_text, encoding="utf-8")
+    with out_path.open("w", encoding="utf-8", buffering=1 << 20) as f:
+        write_products_html(products, f)
+    cache_path.write_text(f"{digest}\n{_file_hash(out_path).hexdigest()}\n", encoding="utf-8")
 
     print(f"Generated: {out_path}")
 
@@ -1,12 +1,39 @@
 from __future__ import annotations
 
 import json
+import re
 from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 START = "// PRODUCTS_DATA_START"
 END = "// PRODUCTS_DATA_END"
 
+_MARKER_RE = re.compile(re.escape(START) + r".*?" + re.escape(END), re.DOTALL)
+
+# Digit runs long enough to overflow a 64-bit integer, which orjson would
+# silently turn into floats
+_LONG_INT_RE = re.compile(rb"\d{19,}")
+
+
+def _has_float(obj: Any) -> bool:
+    # Walk iteratively: orjson accepts deeper nesting than the recursion limit
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if isinstance(o, float):
+            return True
+        if isinstance(o, dict):
+            stack.extend(o.values())
+        elif isinstance(o, list):
+            stack.extend(o)
+    return False
+
 
 def main() -> None:
     root = Path(__file__).resolve().parent
@@ -18,7 +45,18 @@ def main() -> None:
     if not html_path.exists():
         raise SystemExit("products.html not found")
 
-    data = json.loads(json_path.read_text(encoding="utf-8"))
+    # Both parsers take the raw UTF-8 bytes, skipping a separate decode copy.
+    # orjson only handles 64-bit integers and finite floats; anything else
+    # (big ints, 1e400, NaN) goes through the stdlib so values round-trip unchanged
+    raw = json_path.read_bytes()
+    use_orjson = orjson is not None and not _LONG_INT_RE.search(raw)
+    if use_orjson:
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            use_orjson = False
+    if not use_orjson:
+        data = json.loads(raw)
     if not isinstance(data, list):
         raise SystemExit("products.json must be a JSON array")
 
@@ -26,23 +64,28 @@ def main() -> None:
         if not isinstance(item, dict):
             raise SystemExit(f"products.json item #{i} must be an object")
 
-    pretty = json.dumps(data, ensure_ascii=False, indent=2)
+    # orjson writes floats in a different form from json (1e16 vs 1e+16), so
+    # only use it when the output is guaranteed to match the stdlib byte for byte
+    pretty = None
+    if use_orjson and not _has_float(data):
+        try:
+            pretty = orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+        except orjson.JSONEncodeError:
+            # orjson's encoder nests less deeply (~254 levels) than its decoder
+            pass
+    if pretty is None:
+        pretty = json.dumps(data, ensure_ascii=False, indent=2)
 
     html_text = html_path.read_text(encoding="utf-8")
 
-    start_idx = html_text.find(START)
-    end_idx = html_text.find(END)
+    # Replace everything between the START and END markers in a single pass;
+    # a callable replacement keeps backslashes in the JSON literal
+    replacement = f"{START}\n    const PRODUCTS = {pretty};\n    {END}"
+    new_html, n = _MARKER_RE.subn(lambda _m: replacement, html_text, count=1)
 
-    if start_idx == -1 or end_idx == -1 or end_idx < start_idx:
+    if n == 0:
         raise SystemExit("Could not find PRODUCTS_DATA_START/END markers in products.html")
 
-    # Keep everything before START line, and everything after END line
-    before = html_text[: start_idx + len(START)]
-    after = html_text[end_idx:]
-
-    replacement = f"\n    const PRODUCTS = {pretty};\n    "
-
-    new_html = before + replacement + after
     html_path.write_text(new_html, encoding="utf-8")
 
     print("Synced products.json -> products.html")